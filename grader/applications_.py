@@ -6,6 +6,7 @@ import functools
 import pprint
 import re
 import os
+import sys
 
 from . import (person, vector, util)
 from .util import printff
@@ -47,6 +48,14 @@ KNOWN_FIELDS = {
     'travel_grant' : ('travel grants', 'grants'),
 }
 
+# Fields for which many applicants give the very same answer. Their values are
+# interned when loading the CSV file, so that all the applicants (and the old
+# editions in the archive) share one copy of each answer instead of one each
+INTERNED_FIELDS = frozenset((
+    'gender', 'institute', 'group', 'affiliation', 'nationality', 'position',
+    'programming', 'python', 'open_source', 'vcs', 'travel_grant',
+))
+
 # INI-file:
 # the type of the values for the items in the sections of the applications.ini file
 # These types will be enforced by ApplicationsIni.read_config_file
@@ -55,19 +64,44 @@ SECTION_TYPES = {
         '*_rating' : float, # all sections ending with _rating are going to be floats
         'groups_parameters' : int,
         'fields' : util.list_of_equivs,
+        'equivs' : util.list_of_equivs,
         'motivation_score-*' : int,
         }
 
+# Build the lookup tables used by col_name_to_field from the mapping
+# {field-name: (alias1, alias2, …)}. This is done once per CSV header, so
+# that we don't lowercase all field names and aliases for every column
+def index_field_aliases(overrides):
+    # exact matches: {name-or-alias: field-name}. The first occurrence wins,
+    # i.e. a field name or alias shadows the ones of the fields following it
+    exact = {}
+    # fuzzy matches: [(field-name, (alias1, alias2, …)), …]
+    fuzzy = []
+    for key, aliases in overrides.items():
+        assert isinstance(aliases, tuple)
+        # normalize the name of the field and its aliases
+        key = key.lower()
+        aliases = tuple(alias.lower() for alias in aliases)
+        exact.setdefault(key, key)
+        for alias in aliases:
+            exact.setdefault(alias, key)
+        fuzzy.append((key, aliases))
+    return exact, fuzzy
+
 # This function does the real hard-work of parsing the CSV header to map columns
 # to known fields
-def col_name_to_field(description, overrides):
+def col_name_to_field(description, index):
     """Return the name of a field for this description. Must be defined.
 
     The double dance is because we want to map:
     - position <=> position,
     - [other] position <=> position_other,
     - curriculum vitae <=> Please type in a short curriculum vitae...
+
+    index is the output of index_field_aliases.
     """
+    exact, fuzzy = index
+
     # normalize to lowercase and get rid of extraneous whitespace
     description = ' '.join(description.lower().split())
 
@@ -100,28 +134,17 @@ def col_name_to_field(description, overrides):
     if DEBUG_MAPPINGS:
         print(f'looking for {desc!r}')
 
+    # first look for an exact match with the name of a field or one of its aliases
+    if (key := exact.get(desc)) is not None:
+        if DEBUG_MAPPINGS:
+            print('mapped exact key or alias:', key)
+        return key + other
+
     # look over all the column names and find fuzzy matches to decide if one is a
     # clear fit for one of the known fields
     candidates = {}
-    for key, aliases in overrides.items():
-        assert isinstance(aliases, tuple)
-        # normalize the name of the field
-        key = key.lower()
-        if desc == key:
-            # we have an exact match, we can stop here
-            if DEBUG_MAPPINGS:
-                print('mapped exact key:', key)
-            return key + other
+    for key, aliases in fuzzy:
         for alias in aliases:
-            # we did not find a match for the name of the field, loop through
-            # all possible aliases
-            # normalize the alias for the field
-            alias = alias.lower()
-            if desc == alias:
-                # we have a match
-                if DEBUG_MAPPINGS:
-                    print('mapped alias:', alias)
-                return key + other
             if alias in description:
                 # we found a fuzzy match, keep track of it for the moment
                 candidates[key] = len(alias)
@@ -160,12 +183,14 @@ def csv_header_to_fields(header, overrides):
         print('field name overides:')
         pprint.pprint(overrides)
 
+    index = index_field_aliases(overrides)
+
     failed = None
     seen = {}
     for name in header:
         try:
             # convert the current column
-            conv = col_name_to_field(name, overrides)
+            conv = col_name_to_field(name, index)
             if DEBUG_MAPPINGS:
                 print(f'MAPPING: {name!r} → {conv!r}\n')
             if conv in seen:
@@ -188,7 +213,10 @@ def csv_header_to_fields(header, overrides):
 def load_applications_csv(file, field_name_overrides={}, relaxed=False, ini=None):
     # support both file objects and path-strings
     if not hasattr(file, 'read'):
-        file = open(file, encoding='utf-8-sig') ### support for CSV file with BOM
+        # we open it, so we close it once all the rows are read
+        with open(file, encoding='utf-8-sig') as file: ### support for CSV file with BOM
+            yield from load_applications_csv(file, field_name_overrides, relaxed, ini)
+        return
 
     print(f"loading '{file.name}'")
     # let's try to detect the separator
@@ -206,6 +234,8 @@ def load_applications_csv(file, field_name_overrides={}, relaxed=False, ini=None
     assert len(fields) == len(csv_header)      # sanity check
     assert len(set(fields)) == len(csv_header) # two columns map to the same field
 
+    interned = [i for i, field in enumerate(fields) if field in INTERNED_FIELDS]
+
     count = 0
     for entry in reader:
         if (not entry) or len(set(entry)) <= 1:
@@ -214,6 +244,10 @@ def load_applications_csv(file, field_name_overrides={}, relaxed=False, ini=None
             continue
         count += 1
 
+        for i in interned:
+            if i < len(entry):
+                entry[i] = sys.intern(entry[i])
+
         try:
             yield person.Person.from_row(fields, entry, relaxed=relaxed, ini=ini)
         except Exception as exp:
@@ -221,6 +255,18 @@ def load_applications_csv(file, field_name_overrides={}, relaxed=False, ini=None
             print('Detected fields:\n', fields)
             raise
 
+def split_label_filter(labels):
+    """Return the (accept, deny) frozensets for a label filter
+
+    The labels before '-' must all be present, the ones after it must all be
+    absent, e.g. ('XXX', 'YYY', '-', 'ZZZ'). A single label may be given as
+    a string.
+    """
+    labels = iter((labels, )) if type(labels) == str else iter(labels)
+    accept = frozenset(itertools.takewhile(lambda x: x!='-', labels))
+    deny = frozenset(labels)
+    return accept, deny
+
 # This object allow access to the INI file, which contains Person's specific data
 # which is generated by us, like labels and motivation scores, together with other
 # parameters which are relevant for the interpretation of data from the CSV, like
@@ -228,6 +274,7 @@ def load_applications_csv(file, field_name_overrides={}, relaxed=False, ini=None
 # the score and the ranking of the applicants.
 class ApplicationsIni:
     def __init__(self, file):
+        opened = False
         if hasattr(file, 'read'):
             # we got passed some form of file object (we may be running in a test)
             # we should now artificially hamper our performance so that controlling
@@ -243,6 +290,7 @@ class ApplicationsIni:
             # open the file for reading, if it exists
             try:
                 file = open(file)
+                opened = True
                 print(f"loading '{self.filename}'")
             except FileNotFoundError as e:
                 # if the file doesn't exist yet, we'll create it when writing
@@ -261,11 +309,18 @@ class ApplicationsIni:
         self.generation = 0
         self.modifications_without_generation = False
 
+        # cache for the compiled formula: (formula string, code object)
+        self._formula_code = (None, None)
+
         # use config parser to give us a mapping:
         # { section_names : {keys : values} }
         # where the values are alredy converted to the proper types
         self.data = self.read_config_file(file)
 
+        if opened:
+            # we opened the file ourselves, and it has been fully read by now
+            file.close()
+
     @vector.dictify
     def read_config_file(self, file):
         self.config_file_generation = self.generation
@@ -327,7 +382,8 @@ class ApplicationsIni:
         # have been modified in the file
         self.generation += 1
 
-        self.data = self.read_config_file(self.filename.open())
+        with self.filename.open() as file:
+            self.data = self.read_config_file(file)
 
         return True
 
@@ -340,17 +396,13 @@ class ApplicationsIni:
                 case ('motivation_score', identity):
                     yield identity
 
-    #@functools.cache
     def get_ratings(self, field):
         """Return a mapping:  {value → rating}. we expect the field without
         the suffix _rating"""
-        for section_name, section in self.data.items():
-            match section_name.rsplit('_', maxsplit=1):
-                case (name, 'rating'):
-                    if field == name:
-                        # section is already a dictionary
-                        return section
-        return None
+        # this is called for every rating of every person, so look the section
+        # up by name instead of going through all of them.
+        # section is already a dictionary
+        return self.data.get(f'{field}_rating')
 
     def save(self, file=None):
         # save our data to the INI file
@@ -370,7 +422,8 @@ class ApplicationsIni:
         # allow to set items in the section of the INI using a dotted form, for ex:
         # to set [python_rating] -> competent = 1 you can do
         # ApplicationsIni['python_rating.competent'] = 1
-        section_name, key_name = key.split('.')
+        # The key names are allowed to contain dots, like in __getitem__
+        section_name, key_name = key.split('.', maxsplit=1)
 
         if section_name not in self.data:
             # create a new section if we don't find one in the INI
@@ -409,8 +462,12 @@ class ApplicationsIni:
     @vector.vectorize
     def get_motivation_scores(self, fullname):
         # get all motivation scores of a Person
-        for identity in self.identities():
-            yield self.get_motivation_score(fullname, identity)
+        key = fullname.lower()
+        # walk the sections directly, like identities() does, instead of
+        # looking each of them up again by name
+        for section_name, section in self.data.items():
+            if section_name.startswith('motivation_score-'):
+                yield section.get(key)
 
     def get_motivation_score(self, fullname, identity):
         # get the motivation score of a Person as assigned to them by identity
@@ -424,14 +481,20 @@ class ApplicationsIni:
         self[f'{section_name}.{key}'] = value
 
     def get_labels(self, fullname):
-        key = fullname.lower()
-        return self[f'labels.{key}'] or []
+        # this is called for each person whenever labels are checked, so look
+        # the name up in the section directly instead of via a dotted key
+        section = self.data.get('labels')
+        if not section:
+            return []
+        return section.get(fullname.lower()) or []
 
     def set_labels(self, fullname, labels):
         key = fullname.lower()
 
         if not labels:
             self.data['labels'].pop(key)
+            # a per-person setting, tracked like in __setitem__
+            self.modifications_without_generation = True
         else:
             self[f'labels.{key}'] = labels
 
@@ -441,8 +504,20 @@ class ApplicationsIni:
 
     @formula.setter
     def formula(self, formula):
+        # compile first, so that we don't store a formula with syntax errors
+        compile(formula, '--formula--', 'eval')
         self['formula.formula'] = formula
 
+    @property
+    def formula_code(self):
+        """The formula compiled to a code object, ready to be passed to eval"""
+        formula = self.formula
+        # the formula may change through the setter, __setitem__ or a reload,
+        # so the cache is keyed by the formula string itself
+        if self._formula_code[0] != formula:
+            self._formula_code = (formula, compile(formula, '--formula--', 'eval'))
+        return self._formula_code[1]
+
     @property
     def location(self):
         return self['formula.location']
@@ -474,6 +549,17 @@ class Applications:
     def all_affiliations(self):
         return set(p.affiliation for p in self.people)
 
+    # the two following sets are used to look up people from the current
+    # edition in the archive of past editions: a hash lookup instead of a
+    # regexp scan over all the people of every past edition
+    @functools.cache
+    def all_fullnames(self):
+        return set(p.fullname.lower() for p in self.people)
+
+    @functools.cache
+    def all_emails(self):
+        return set(p.email.lower() for p in self.people)
+
     def __getitem__(self, key):
         """Get people by numerical index or by fullname"""
         # we want to be able to do applications[0] and application["mario rossi"]
@@ -488,6 +574,11 @@ class Applications:
     def __len__(self):
         return len(self.people)
 
+    def __iter__(self):
+        # without this, iteration would go through __getitem__ one index at
+        # a time, until it raises IndexError
+        return iter(self.people)
+
     def filter(self, **kwargs):
         """Return a sequence of the applications which match certain criteria:
 
@@ -529,12 +620,12 @@ class Applications:
         labels = kwargs.pop('label', None)
         if labels is not None:
             matching = []
-            labels = iter((labels, )) if type(labels) == str else iter(labels)
-            accept = frozenset(itertools.takewhile(lambda x: x!='-', labels))
-            deny = frozenset(labels)
+            accept, deny = split_label_filter(labels)
+            # subset and disjointness checks answer the question
+            # without building the difference and intersection sets
             for p in self.people:
-                labels = set(p.labels)
-                if not (accept - labels) and not (labels & deny):
+                labels = p.labels
+                if accept.issubset(labels) and deny.isdisjoint(labels):
                     matching.append(p)
         else:
             matching = self.people[:]
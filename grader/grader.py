@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 import argparse
+import ast
 import collections
+import csv
+import functools
 import io
 import itertools
 import keyword
@@ -30,7 +33,8 @@ from . import cmd_completer
 from .flags import flags as FLAGS
 from . import vector
 
-from .applications_ import Applications
+from .applications_ import Applications, split_label_filter
+from .person import rating_key
 
 from .util import (
     list_of_equivs,
@@ -43,6 +47,9 @@ from .util import (
 def ellipsize(s, width):
     return s if len(s) <= width else s[:width-1] + '…'
 
+# used to flatten free texts on a single line
+_NL_TABLE = str.maketrans('\n\r', '  ')
+
 COLOR = {
     'default': '\x1b[0m',
     'grey'   : '\x1b[1;30m',
@@ -170,6 +177,15 @@ LABEL_VALUES = {
     'OVERQUALIFIED': -650,
 }
 
+# (accept, deny) label filters of the mailing lists written by do_write
+# which do not depend on the labels in use
+_LIST_CONFIRMED = split_label_filter(('CONFIRMED', '-', 'DECLINED', 'NEXT-YEAR'))
+_LIST_INVITE = split_label_filter(('INVITE', '-', 'DECLINED', 'CONFIRMED', 'NEXT-YEAR'))
+_LIST_OVERQUALIFIED = split_label_filter(('OVERQUALIFIED', '-', 'CUSTOM-ANSWER'))
+_LIST_CUSTOM_ANSWER = split_label_filter('CUSTOM-ANSWER')
+_LIST_NEXT_YEAR = split_label_filter('NEXT-YEAR')
+_LIST_DECLINED = split_label_filter(('DECLINED', '-', 'NEXT-YEAR'))
+
 def equal(a, b):
     # Fuck people who designed this nan != nan crap.
     # Fuck people who implemented it in Python like blind sheep.
@@ -192,6 +208,16 @@ class Grader(cmd_completer.Cmd_Completer):
         self.applications = Applications(csv_file=csv_file)
         self.archive = []
 
+        # cache for the results of find_min_max: (ini generation, results)
+        self._formula_bounds = (None, None)
+        # reverse lookup for the equivs:
+        # (ini generation, {spelling: key}, {variant: key})
+        self._equiv_index = (None, None, None)
+        # cache for str(person) used by grep: {id(person): (generation, text)}
+        self._grep_texts = {}
+        # the last ranking: (_ranking_key, people ordered by rank)
+        self._ranking = (None, None)
+
         for path in sorted(csv_file.parent.glob('*/applications.csv'),
                               reverse=True):
             # years before 2012 are to be treated less strictly
@@ -202,6 +228,9 @@ class Grader(cmd_completer.Cmd_Completer):
         for person in self.applications:
             person.set_n_applied(self.archive)
 
+        # (name, lastname) pairs for completion, bucketed by the initials
+        self._name_index = self._build_name_index()
+
 
     def _set_applied(self, person):
         "Return the number of times a person applied"
@@ -245,12 +274,23 @@ class Grader(cmd_completer.Cmd_Completer):
 
         Name or last-name must start with prefix.
         """
+        if prefix:
+            candidates = self._name_index.get(prefix[0], ())
+        else:
+            candidates = ((p.name, p.lastname) for p in self.applications)
         completions = collections.defaultdict(set)
-        for p in self.applications:
-            if p.name.startswith(prefix) or p.lastname.startswith(prefix):
-                completions[p.name].add(p.lastname)
+        for name, lastname in candidates:
+            if name.startswith(prefix) or lastname.startswith(prefix):
+                completions[name].add(lastname)
         return completions
 
+    def _build_name_index(self):
+        index = collections.defaultdict(set)
+        for p in self.applications:
+            for initial in {p.name[:1], p.lastname[:1]}:
+                index[initial].add((p.name, p.lastname))
+        return dict(index)
+
     identity_options = cmd_completer.PagedArgumentParser('identity')\
         .add_argument('identity', type=int, choices=IDENTITIES,
                       help='become this identity')
@@ -357,17 +397,24 @@ class Grader(cmd_completer.Cmd_Completer):
     do_dump.completions = _complete_name
 
     def _dump(self, persons, format='short'):
-        for p in persons:
-            self._dumpone(p, format=format)
+        # ratings are shared by all people giving the same answer
+        rating_cache = {}
+        # format everybody first and write it all out at once
+        sys.stdout.write(''.join(self._format_one(p, format, rating_cache) + '\n'
+                                 for p in persons))
 
-    def _dumpone(self, p, format='short'):
+    def _dumpone(self, p, format='short', rating_cache=None):
+        print(self._format_one(p, format, rating_cache))
+
+    def _format_one(self, p, format='short', rating_cache=None):
         position_other = \
             (' ({})'.format(p.position_other) if p.position=='Other' else '')
         if format == 'short':
-            pd = p.programming_description.replace('\n', ' ')[:72]
-            osd = p.open_source_description.replace('\n', ' ')[:72]
-            cv = p.cv.replace('\n', ' ')[:72]
-            motivation = p.motivation.replace('\n', ' ')[:72]
+            # truncate first, so that we don't copy the whole text
+            pd = p.programming_description[:72].translate(_NL_TABLE)
+            osd = p.open_source_description[:72].translate(_NL_TABLE)
+            cv = p.cv[:72].translate(_NL_TABLE)
+            motivation = p.motivation[:72].translate(_NL_TABLE)
         else:
             pd = wrap_paragraphs(p.programming_description, 'programming: ') + '\n'
             osd = wrap_paragraphs(p.open_source_description, 'open source: ') + '\n'
@@ -382,7 +429,9 @@ class Grader(cmd_completer.Cmd_Completer):
             # hide identifying info from motivation text if in grading mode
             motivation = motivation.replace(p.name, '–')
             motivation = motivation.replace(p.lastname, '–')
-        labels = f'[{p.labels}] ' if p.labels else ' '
+        # p.labels is a property looking up the INI file, fetch it only once
+        labels = p.labels
+        labels = f'[{labels}] ' if labels else ' '
 
         # categories = {'programming': self.programming_rating,
         #               'open_source': self.open_source_rating,
@@ -392,15 +441,9 @@ class Grader(cmd_completer.Cmd_Completer):
         # cat_ratings = categorical_ratings(p, categories)
         # cat_ratings = {f'{k}_rating':v for k,v in cat_ratings.items()}
 
-        cat_ratings = {
-            'programming_rating': p.get_rating('programming'),
-            'open_source_rating': p.get_rating('open_source'),
-            'python_rating': p.get_rating('python'),
-            'vcs_rating': p.get_rating('vcs'),
-            'underrep_rating': p.get_rating('underrep'),
-        }
+        cat_ratings = categorical_scores(p, self.RATING_FIELDS, rating_cache)
 
-        printf(DUMP_FMTS[format],
+        return DUMP_FMTS[format].format(
                p=p,
                have_applied=format_have_applied(p),
                position_other=position_other,
@@ -438,10 +481,20 @@ class Grader(cmd_completer.Cmd_Completer):
     def do_grep(self, args):
         "Look for string in applications"
         opts = self.grep_options.parse_args(args.split())
+        pattern = re.compile(opts.pattern)
+        what = self._grep_text if opts.what is str else opts.what
         which = (p for p in self.applications
-                 if re.search(opts.pattern, opts.what(p)))
+                 if pattern.search(what(p)))
         self._dump(which, format=opts.format)
 
+    def _grep_text(self, person):
+        "Return str(person), cached until person is modified"
+        generation, text = self._grep_texts.get(id(person), (None, None))
+        if generation != person._generation:
+            text = str(person)
+            self._grep_texts[id(person)] = (person._generation, text)
+        return text
+
 
     def print_grading_stats(self, applications):
         if pandas is None:
@@ -498,18 +551,10 @@ class Grader(cmd_completer.Cmd_Completer):
 
         if opts.what == 'formula':
             if opts.person:
-                self.formula = ' '.join(opts.person)
-            minsc, maxsc, contr = find_min_max(self.formula, self.location,
-                                               self.programming_rating,
-                                               self.open_source_rating,
-                                               self.python_rating,
-                                               self.vcs_rating,
-                                               self.underrep_rating,
-                                               self._applied_range(),
-                                               self.all_nationalities,
-                                               self.all_affiliations)
-
-            printf('formula = {}', self.formula)
+                self.applications.ini.formula = ' '.join(opts.person)
+            minsc, maxsc, contr = self._find_min_max()
+
+            printf('formula = {}', self.applications.ini.formula)
             printf('score ∈ [{:6.3f},{:6.3f}]', minsc, maxsc)
             printf('applied ∈ {}', self._applied_range())
             print('contributions:')
@@ -564,7 +609,8 @@ class Grader(cmd_completer.Cmd_Completer):
                                 self._get_grading(p, identity=opts.disagreement)) > 1)]
             total = len(todo)
 
-        done_already = total - len(todo)
+        remaining = len(todo)
+        done_already = total - remaining
 
         if opts.stat:
             self.print_grading_stats(applications)
@@ -576,7 +622,7 @@ class Grader(cmd_completer.Cmd_Completer):
         random.shuffle(todo)
         for num, person in enumerate(todo):
             progress = '┃ {:.1%} done, {} left to go ┃'.format((num + done_already) / total,
-                                                             len(todo) - num)
+                                                             remaining - num)
             sep_up = '\n┏'+(len(progress)-2)*'━'+'┓\n'
             sep_down = '\n┗'+(len(progress)-2)*'━'+'┛\n'
             print(sep_up+progress+sep_down)
@@ -585,6 +631,8 @@ class Grader(cmd_completer.Cmd_Completer):
                 break
 
     RATING_CATEGORIES = ['programming', 'open_source', 'python', 'vcs', 'underrep']
+    # the names under which the ratings appear in formulas and dump formats
+    RATING_FIELDS = [f'{c}_rating' for c in RATING_CATEGORIES]
 
     rate_options = cmd_completer.PagedArgumentParser('rate')\
         .add_argument('-m', '--missing', action='store_true',
@@ -617,8 +665,7 @@ class Grader(cmd_completer.Cmd_Completer):
             else:
                 current.print_sorted()
                 if opts.missing:
-                    used = set(getattr(p, what).lower()
-                               for p in self.applications)
+                    used = set(getattr(p, what) for p in self.applications)
                     for descr in used:
                         try:
                             get_rating(what, current, descr)
@@ -636,17 +683,29 @@ class Grader(cmd_completer.Cmd_Completer):
         gen = (self._get_grading(person, identity) for identity in self.applications.ini.identities())
         return list_of_float(gen)
 
+    def _all_gradings(self, people):
+        """Return a mapping {fullname → gradings} for people
+
+        Each section of motivation scores is looked up only once.
+        """
+        ini = self.applications.ini
+        sections = [ini[f'motivation_score-{identity}'] or {}
+                    for identity in ini.identities()]
+        return {p.fullname: list_of_float(section.get(p.fullname.lower())
+                                          for section in sections)
+                for p in people}
+
     def _set_grading(self, person, score):
         assert isinstance(score, numbers.Number), score
         person.set_motivation_score(score, identity=self.identity)
         printff('Motivation score set to {}', score)
 
     def _grade(self, person, disagreement):
+        old_score = self._get_grading(person)
         if disagreement:
             scores = self._get_gradings(person)
         else:
-            scores = [self._get_grading(person)]
-        old_score = self._get_grading(person)
+            scores = [old_score]
         default = old_score if old_score is not None else ''
         self._dumpone(person, format='motivation')
 
@@ -659,9 +718,10 @@ class Grader(cmd_completer.Cmd_Completer):
             except:
                 return False
 
+        # the prompt doesn't change while we ask again
+        prompt = 'Your choice {}/s/d/l LABEL [{}]? '.format(SCORE_RANGE, default)
         valid_choice = None
         while valid_choice not in SCORE_RANGE:
-            prompt = 'Your choice {}/s/d/l LABEL [{}]? '.format(SCORE_RANGE, default)
             try:
                 choice = input(prompt)
             except EOFError:
@@ -718,11 +778,13 @@ class Grader(cmd_completer.Cmd_Completer):
         if not use_labels:
             return p.score
 
+        # p.labels is a property looking up the INI file, fetch it only once
+        labels = p.labels
         add_score = 0
         for label, value in LABEL_VALUES.items():
-            if label in p.labels:
+            if label in labels:
                 add_score += value
-            elif label=='INVITESL' and any('INVITESL' in l for l in p.labels):
+            elif label=='INVITESL' and any('INVITESL' in l for l in labels):
                 add_score += value
         return p.score + add_score
 
@@ -737,26 +799,12 @@ class Grader(cmd_completer.Cmd_Completer):
         if ini.formula is None:
             raise ValueError('formula not set yet')
 
-        #if self.ranking_done:
-        #    return
-        #else:
-        #    self.ranking_done = True
-        categories = {
-            'programming_rating': ini.get_ratings("programming"),
-            'open_source_rating': ini.get_ratings("open_source"),
-            'python_rating':      ini.get_ratings("python"),
-            'vcs_rating':         ini.get_ratings("vcs"),
-            'underrep_rating':    ini.get_ratings("underrep"),
-        }
+        cached_key, ordered = self._ranking
+        if cached_key == self._ranking_key(use_labels):
+            # nothing has changed since the last ranking
+            return ordered
 
-        minsc, maxsc, contr = find_min_max(
-            ini[f'formula.formula'],
-            ini[f'formula.location'],
-            **categories,
-            applied=self._applied_range(),
-            all_nationalities=self.applications.all_nationalities(),
-            all_affiliations=self.applications.all_affiliations(),
-        )
+        minsc, maxsc, contr = self._find_min_max()
 
         # for person in self.applications:
         #     #labels = self.applications.ini.get_labels(person.fullname)
@@ -769,19 +817,30 @@ class Grader(cmd_completer.Cmd_Completer):
         #                                person.labels,
         #                                person.n_applied)
 
-        nan_to_value = lambda n: LABEL_VALUES['__nan__'] if np.isnan(n) else n
-
-        ordered = sorted(self.applications.people,
-                         key=lambda p: nan_to_value(self._score_with_labels(p, use_labels=use_labels)),
-                         reverse=True)
+        people = self.applications.people
+        score_with_labels = self._score_with_labels
+        scores = np.fromiter((score_with_labels(p, use_labels=use_labels)
+                              for p in people),
+                             dtype=float, count=len(people))
+        # put people without score near the end of the list
+        scores[np.isnan(scores)] = LABEL_VALUES['__nan__']
+        # a stable sort in descending order: people with the same score keep
+        # their relative order, like with sorted(..., reverse=True)
+        order = np.argsort(-scores, kind='stable')
+        ordered = [people[i] for i in order]
 
         rank, prevscore = 0, 10000
         highlander = True
         labs = {}
         count = 0
+        # loop invariants: accept_count is parsed from the INI file each time
+        accept_count = self.accept_count
+        group_institute = self._group_institute
         # rank fairly now
         for person in ordered:
-            lab = self._group_institute(person)
+            lab = group_institute(person)
+            # score is a cached property, but building its cache key is not free
+            score = person.score
             person.samelab = highlander and lab in labs
 
             #if 'VIP' in self._labels(person.fullname):
@@ -794,24 +853,65 @@ class Grader(cmd_completer.Cmd_Completer):
             if person.samelab:
                 finalrank = labs[lab]
             else:
-                if person.score != prevscore:
+                if score != prevscore:
                     rank += 1
                 finalrank = labs[lab] = rank
 
             count += 1
-            if highlander and person.score != prevscore and count > self.accept_count:
+            if highlander and score != prevscore and count > accept_count:
                 highlander = False
 
             person.rank = finalrank
             person.highlander = highlander
-            prevscore = person.score
+            prevscore = score
+
+        # the key is computed only now, because setting the rank and
+        # the other attributes above changes the generation of each person
+        self._ranking = (self._ranking_key(use_labels), ordered)
         return ordered
 
+    def _ranking_key(self, use_labels):
+        # the ranking is outdated whenever the global state of the INI file
+        # or any person (scores, labels, overrides, …) is modified
+        return (use_labels,
+                self.applications.ini.generation,
+                tuple(p._generation for p in self.applications.people))
+
+    def _find_min_max(self):
+        """Return (minsc, maxsc, contributions) for the current formula
+
+        The results only depend on the global state of the INI file (formula,
+        location and ratings), so they are cached until its generation changes.
+        """
+        ini = self.applications.ini
+        generation, bounds = self._formula_bounds
+        if generation == ini.generation:
+            return bounds
+
+        categories = {
+            'programming_rating': ini.get_ratings("programming"),
+            'open_source_rating': ini.get_ratings("open_source"),
+            'python_rating':      ini.get_ratings("python"),
+            'vcs_rating':         ini.get_ratings("vcs"),
+            'underrep_rating':    ini.get_ratings("underrep"),
+        }
+
+        bounds = find_min_max(
+            ini.formula,
+            ini['formula.location'],
+            **categories,
+            applied=self._applied_range(),
+            all_nationalities=self.applications.all_nationalities(),
+            all_affiliations=self.applications.all_affiliations(),
+        )
+        self._formula_bounds = (ini.generation, bounds)
+        return bounds
+
     def _ranked(self, applicants=None, use_labels=False):
         ranked = self._assign_rankings(use_labels=use_labels)
 
         if applicants is not None:
-            applicants_names = [p.fullname for p in applicants]
+            applicants_names = {p.fullname for p in applicants}
             ranked_applications = [p for p in ranked if p.fullname in applicants_names]
         else:
             ranked_applications = ranked
@@ -820,11 +920,24 @@ class Grader(cmd_completer.Cmd_Completer):
 
     def _equiv_master(self, variant):
         "Return the key for equiv canonicalization"
-        for key, values in self.applications.ini['equivs'].items():
-            if (variant.lower() == key.lower() or
-                variant.lower() in (spelling.lower() for spelling in values)):
-                return key
-        return variant.strip()
+        ini = self.applications.ini
+        generation, index, resolved = self._equiv_index
+        if generation != ini.generation:
+            # invert [equivs] once: {lowercase spelling → key}, where
+            # the first key listing a given spelling wins
+            index = {}
+            for key, values in (ini['equivs'] or {}).items():
+                for spelling in (key, *values):
+                    index.setdefault(spelling.lower(), key)
+            # the same institutes and groups come up over and over,
+            # so remember the answer for each variant as given
+            resolved = {}
+            self._equiv_index = (ini.generation, index, resolved)
+        try:
+            return resolved[variant]
+        except KeyError:
+            master = resolved[variant] = index.get(variant.lower(), variant.strip())
+            return master
 
     rank_options = cmd_completer.PagedArgumentParser('rank')\
         .add_argument('-s', '--short', action='store_const',
@@ -848,23 +961,43 @@ class Grader(cmd_completer.Cmd_Completer):
         people = self.applications.filter(label=opts.label)
         ranked = self._ranked(people, use_labels=opts.use_labels)
         self.last_ranking = ranked
-        fullname_width = min(max(len(field) for field in ranked.fullname), opts.width)
-        email_width = max(len(field) for field in ranked.email) + 2
-        institute_width = min(max(len(self._equiv_master(field)) for field in ranked.institute), opts.width)
-        group_width = min(max(len(self._equiv_master(field)) for field in ranked.group), opts.width)
-        affiliation_width = min(max(len(field) for field in ranked.affiliation), COUNTRY_WIDTH)
-        nationality_width = min(max(len(field) for field in ranked.nationality), COUNTRY_WIDTH)
-        labels_width = max(len(str(self.applications.ini.get_labels(field)))
-                           for field in ranked.fullname) or 1
+        # the columns which need a lookup, computed once for each person
+        institutes = [self._equiv_master(person.institute) for person in ranked]
+        groups = [self._equiv_master(person.group) for person in ranked]
+        all_labels = [person.labels for person in ranked]
+
+        # find the widest value of each column in a single pass
+        fullname_width = email_width = institute_width = group_width = 0
+        affiliation_width = nationality_width = labels_width = 0
+        for person, institute, group, labels in zip(ranked, institutes, groups, all_labels):
+            fullname_width = max(fullname_width, len(person.fullname))
+            email_width = max(email_width, len(person.email))
+            institute_width = max(institute_width, len(institute))
+            group_width = max(group_width, len(group))
+            affiliation_width = max(affiliation_width, len(person.affiliation))
+            nationality_width = max(nationality_width, len(person.nationality))
+            labels_width = max(labels_width, len(str(labels)))
+        fullname_width = min(fullname_width, opts.width)
+        email_width += 2
+        institute_width = min(institute_width, opts.width)
+        group_width = min(group_width, opts.width)
+        affiliation_width = min(affiliation_width, COUNTRY_WIDTH)
+        nationality_width = min(nationality_width, COUNTRY_WIDTH)
+        labels_width = labels_width or 1
 
         fmt = RANK_FORMATS[opts.format]
+        categories = self.RATING_FIELDS
+        rating_cache = {}
+        gradings = self._all_gradings(ranked)
         prev_highlander = True
-        print(COLOR['grey']+'-' * 70+COLOR['default'])
-        for pos, person in enumerate(ranked):
+        separator = COLOR['grey']+'-' * 70+COLOR['default']
+        # collect the rows and write them out in one go at the end
+        lines = [separator]
+        for pos, (person, institute, group, labels) in enumerate(
+                zip(ranked, institutes, groups, all_labels)):
             if prev_highlander and not person.highlander:
-                print(COLOR['grey']+'-' * 70+COLOR['default'])
+                lines.append(separator)
             prev_highlander = person.highlander
-            labels = person.labels
             if 'CONFIRMED' in labels:
                 line_color = COLOR['bold']
             elif 'NEXT-YEAR' in labels:
@@ -880,24 +1013,15 @@ class Grader(cmd_completer.Cmd_Completer):
             else:
                 line_color = COLOR['grey']
 
-            group = self._equiv_master(person.group)
-            institute = self._equiv_master(person.institute)
-
-            categories = {
-                'programming_rating': self.applications.ini.get_ratings("programming"),
-                'open_source_rating': self.applications.ini.get_ratings("open_source"),
-                'python_rating':      self.applications.ini.get_ratings("python"),
-                'vcs_rating':         self.applications.ini.get_ratings("vcs"),
-                'underrep_rating':    self.applications.ini.get_ratings("underrep"),
-            }
-            cat_scores = categorical_scores(person, categories)
+            cat_scores = categorical_scores(person, categories, rating_cache)
             cat_scores = {f'{k}_score':v for k,v in cat_scores.items()}
 
             # share the space for name and email to avoid overflows
             name_width_adj = min(len(person.fullname) - fullname_width, email_width - len(person.email) - 2)
             name_width_adj = max(name_width_adj, 0)
 
-            printf(line_color + fmt + COLOR['default'], pos + 1, p=person,
+            lines.append((line_color + fmt + COLOR['default']).format(
+                   pos + 1, p=person,
                    email='<{}>'.format(person.email),
                    have_applied=format_have_applied(person, 1),
                    gender=person.gender,
@@ -915,8 +1039,10 @@ class Grader(cmd_completer.Cmd_Completer):
                    affiliation_width=affiliation_width,
                    labels=', '.join(labels),
                    labels_width=labels_width,
-                   motivation_scores=colored_scores(self._get_gradings(person)),
-                   **cat_scores)
+                   motivation_scores=colored_scores(gradings[person.fullname]),
+                   **cat_scores))
+
+        sys.stdout.write('\n'.join(lines) + '\n')
 
     stat_options = (
         cmd_completer.PagedArgumentParser('stat')
@@ -970,38 +1096,39 @@ class Grader(cmd_completer.Cmd_Completer):
         observables = ['born', 'gender', 'nationality', 'affiliation',
                        'position', 'applied', 'n_applied', 'open_source',
                        'programming', 'python', 'vcs', 'underrep']
-        counters = {var: collections.Counter(getattr(p, var, NOT_AVAILABLE_LABEL)
-                                             for p in pool)
-                    for var in observables}
+        counters = count_observables(pool, observables)
 
         length = {var: len(counters[var]) for var in observables}
         applicants = len(pool)
         FMT_STAT = '{:<26.26} = {:>5d}'
         FMT_STAP = FMT_STAT + ' ({:4.1f}%)'
-        printf(FMT_STAT, 'Pool', applicants)
-        printf(FMT_STAT, 'Nationalities', length['nationality'])
-        printf(FMT_STAT, 'Countries of affiliation', length['affiliation'])
+        # collect the whole report and write it out at once
+        lines = []
+        lines.append(FMT_STAT.format('Pool', applicants))
+        lines.append(FMT_STAT.format('Nationalities', length['nationality']))
+        lines.append(FMT_STAT.format('Countries of affiliation', length['affiliation']))
         g = counters['gender']
         # normalise gender counters (old editions used capitalized gender names)
         g['female'] = g['female'] + g['Female']
         g['male'] = g['male'] + g['Male']
-        printf(FMT_STAP, 'Gender: other',  g['other'],  g['other'] / applicants * 100)
-        printf(FMT_STAP, 'Gender: female', g['female'], g['female'] / applicants * 100)
-        printf(FMT_STAP, 'Gender: male', g['male'],   g['male'] / applicants * 100)
+        lines.append(FMT_STAP.format('Gender: other',  g['other'],  g['other'] / applicants * 100))
+        lines.append(FMT_STAP.format('Gender: female', g['female'], g['female'] / applicants * 100))
+        lines.append(FMT_STAP.format('Gender: male', g['male'],   g['male'] / applicants * 100))
         for pos in counters['position'].most_common():
-            printf(FMT_STAP, 'Position: '+pos[0], pos[1], pos[1] / applicants * 100)
+            lines.append(FMT_STAP.format('Position: '+pos[0], pos[1], pos[1] / applicants * 100))
         if detailed:
             for var in observables:
-                print('--\n'+var.upper())
+                lines.append('--\n'+var.upper())
                 if var in ('born', 'n_applied'):
                     # years should be sorted numerically and not by popularity
                     for n in sorted(counters[var].items(),
                             key=operator.itemgetter(0)):
-                        printf(FMT_STAP, str(n[0]), n[1], n[1] / applicants * 100)
+                        lines.append(FMT_STAP.format(str(n[0]), n[1], n[1] / applicants * 100))
                 else:
                     for n in sorted(counters[var].items(),
                                     key=operator.itemgetter(1), reverse=True):
-                        printf(FMT_STAP, str(n[0]), n[1], n[1] / applicants * 100)
+                        lines.append(FMT_STAP.format(str(n[0]), n[1], n[1] / applicants * 100))
+        sys.stdout.write('\n'.join(lines) + '\n')
 
     def _wiki_tb_head(self, items):
         strs = (str(x) for x in items)
@@ -1036,12 +1163,8 @@ class Grader(cmd_completer.Cmd_Completer):
         observables = ['born', 'gender', 'nationality', 'affiliation',
                        'position', 'applied', 'n_applied', 'open_source',
                        'programming', 'python', 'vcs', 'underrep']
-        c_confirmed = {var: collections.Counter(getattr(p, var, NOT_AVAILABLE_LABEL)
-                                                for p in confirmed)
-                       for var in observables}
-        c_applicants = {var: collections.Counter(getattr(p, var, NOT_AVAILABLE_LABEL)
-                                                 for p in applicants)
-                       for var in observables}
+        c_confirmed = count_observables(confirmed, observables)
+        c_applicants = count_observables(applicants, observables)
 
         Na = len(applicants)
         Nc = len(confirmed)
@@ -1081,16 +1204,19 @@ class Grader(cmd_completer.Cmd_Completer):
 
     def do_equiv(self, args):
         "Specify institutions'/labs' names as equivalent"
+        ini = self.applications.ini
         if args == '':
-            for key, value in self.config['equivs'].items():
+            for key, value in (ini['equivs'] or {}).items():
                 printf('{} = {}', key, value)
             return
 
         variant, *equivs = [item.strip() for item in args.split('=')]
-        saved = self.config['equivs'].get(variant, list_of_equivs())
-        saved.extend(equivs)
-        self.config['equivs'][variant] = saved
-        self.ranking_done = False
+        # keys are stored lowercased, like configparser does when reading
+        key = f'equivs.{variant.lower()}'
+        saved = ini[key] or list_of_equivs()
+        # going through the ini bumps its generation,
+        # which invalidates the index used by _equiv_master
+        ini[key] = ' = '.join(saved + equivs)
 
     def do_label(self, args):
         """Mark persons with string labels
@@ -1110,26 +1236,39 @@ class Grader(cmd_completer.Cmd_Completer):
             return
 
         if '=' in args:
-            fullname, *labels = [item.strip() for item in args.split('=')
-                                 if item != '']
+            # 'label First Last = ' must clear the labels, so filter
+            # after stripping, otherwise ' ' would become an empty label
+            fullname, *labels = [item for item in map(str.strip, args.split('='))
+                                 if item]
+            try:
+                applicant = applications[fullname]
+            except IndexError:
+                printf("no person or label matches '{}'", fullname)
+                return
             if labels:
-                applications.add_labels(fullname, labels)
+                for label in labels:
+                    applicant.add_label(label)
             else:
-                applications.clear_labels(fullname)
+                # iterate over a copy, remove_label modifies the list in place
+                for label in list(applicant.labels):
+                    applicant.remove_label(label)
         else:
-            display_by_label = any(label in set(args.split())
-                                   for label in applications.get_all_labels())
+            queried = args.split()
+            people_by_label = self._people_by_label()
+            display_by_label = not people_by_label.keys().isdisjoint(queried)
             if display_by_label:
-                for label in args.split():
-                    count = 0
+                for label in queried:
+                    fullnames = people_by_label.get(label, ())
                     printf('== {} ==', label)
-                    for applicant in applications:
-                        if label in applicant.labels:
-                            printf('{}. {}', count, applicant.fullname.lower())
-                            count += 1
-                    printf('== {} labelled ==', count)
+                    for count, fullname in enumerate(fullnames):
+                        printf('{}. {}', count, fullname.lower())
+                    printf('== {} labelled ==', len(fullnames))
             else:
-                applicant = applications.find_applicant_by_fullname(args)
+                try:
+                    applicant = applications[args]
+                except IndexError:
+                    printf("no person or label matches '{}'", args)
+                    return
                 labels = applicant.labels
                 if labels:
                     printf('{} = {}', args, labels)
@@ -1138,6 +1277,15 @@ class Grader(cmd_completer.Cmd_Completer):
 
     do_label.completions = _complete_name
 
+    def _people_by_label(self):
+        "Return {label: [fullname, …]} with people in the order of the applications"
+        # one pass over everybody's labels, instead of one pass per label
+        index = {}
+        for applicant in self.applications:
+            for label in applicant.labels:
+                index.setdefault(label, []).append(applicant.fullname)
+        return index
+
     save_options = cmd_completer.PagedArgumentParser('save')\
         .add_argument('filename', nargs='?')
 
@@ -1160,75 +1308,114 @@ class Grader(cmd_completer.Cmd_Completer):
         """
         if args != '':
             raise ValueError('no args please')
-        applications = self.applications
-
-        _write_file('list_confirmed.csv',
-                    applications.filter(label=('CONFIRMED', '-', 'DECLINED', 'NEXT-YEAR')))
-
-        _write_file('list_invite.csv',
-                    applications.filter(label=('INVITE', '-', 'DECLINED', 'CONFIRMED', 'NEXT-YEAR')))
-        _write_file('list_invite_reminder.csv',
-                    applications.filter(label=('INVITE', '-', 'DECLINED', 'CONFIRMED', 'NEXT-YEAR')))
-        _write_file('list_overqualified.csv',
-                    applications.filter(label=('OVERQUALIFIED', '-', 'CUSTOM-ANSWER')))
-        _write_file('list_custom_answer.csv',
-                    applications.filter(label=('CUSTOM-ANSWER')))
+        # everybody's (name, lastname, email) row and labels, fetched once,
+        # in two parallel lists
+        rows = [(p.name, p.lastname, p.email) for p in self.applications]
+        label_sets = [frozenset(p.labels) for p in self.applications]
         # get all INVITESL? labels
-        all_labels = self.applications.get_all_labels()
-        invitesl = [label for label in all_labels
-                    if label.startswith('INVITESL')]
-        for i, sl_label in enumerate(invitesl):
-            _write_file_samelab(
-                'list_same_lab%d.csv'%(i+1),
-                applications.filter(label=(sl_label,'-', 'CONFIRMED', 'DECLINED', 'NEXT-YEAR')))
-        _write_file('list_shortlist.csv',
-                    applications.filter(label=('SHORTLIST', '-', 'DECLINED', 'NEXT-YEAR', 'CONFIRMED', 'INVITE', *invitesl)))
-        _write_file('list_rejected.csv',
-                    applications.filter(
-                        label=('-', 'DECLINED', 'NEXT-YEAR', 'CONFIRMED', 'INVITE', 'SHORTLIST',
-                               'OVERQUALIFIED', 'CUSTOM-ANSWER', *invitesl)))
-        _write_file('list_invite_nextyear.csv',
-                    applications.filter(label=('NEXT-YEAR')))
-        _write_file('list_declined.csv',
-                    applications.filter(label=('DECLINED', '-', 'NEXT-YEAR')))
-
-def _write_file(filename, persons):
-    header = '$NAME$;$SURNAME$;$EMAIL$'
+        all_labels = frozenset().union(*label_sets)
+        invitesl = sorted(label for label in all_labels
+                          if label.startswith('INVITESL'))
+
+        # (filename, writer, (accept, deny)) in the order the files are written
+        lists = [
+            ('list_confirmed.csv', _write_file, _LIST_CONFIRMED),
+            ('list_invite.csv', _write_file, _LIST_INVITE),
+            ('list_invite_reminder.csv', _write_file, _LIST_INVITE),
+            ('list_overqualified.csv', _write_file, _LIST_OVERQUALIFIED),
+            ('list_custom_answer.csv', _write_file, _LIST_CUSTOM_ANSWER),
+            *(('list_same_lab%d.csv'%(i+1), _write_file_samelab,
+               split_label_filter((sl_label,'-', 'CONFIRMED', 'DECLINED', 'NEXT-YEAR')))
+              for i, sl_label in enumerate(invitesl)),
+            ('list_shortlist.csv', _write_file,
+             split_label_filter(('SHORTLIST', '-', 'DECLINED', 'NEXT-YEAR', 'CONFIRMED',
+                                 'INVITE', *invitesl))),
+            ('list_rejected.csv', _write_file,
+             split_label_filter(('-', 'DECLINED', 'NEXT-YEAR', 'CONFIRMED', 'INVITE',
+                                 'SHORTLIST', 'OVERQUALIFIED', 'CUSTOM-ANSWER', *invitesl))),
+            ('list_invite_nextyear.csv', _write_file, _LIST_NEXT_YEAR),
+            ('list_declined.csv', _write_file, _LIST_DECLINED),
+        ]
+
+        # sort everybody into the lists in a single pass
+        selectors = [selector for _, _, selector in lists]
+        buckets = [[] for _ in lists]
+        # most people share the same few sets of labels (usually none at all),
+        # so the filters are checked only once for each distinct set
+        destinations = {}
+        for row, labels in zip(rows, label_sets):
+            try:
+                matching = destinations[labels]
+            except KeyError:
+                matching = destinations[labels] = [
+                    bucket for (accept, deny), bucket in zip(selectors, buckets)
+                    if accept <= labels and labels.isdisjoint(deny)]
+            for bucket in matching:
+                bucket.append(row)
+
+        for (filename, write, _), bucket in zip(lists, buckets):
+            write(filename, bucket)
+
+def count_observables(pool, observables):
+    """Return a mapping {observable → Counter of its values in pool}
+
+    All counters are filled in a single pass over pool.
+    """
+    counters = {var: collections.Counter() for var in observables}
+    for p in pool:
+        for var, counter in counters.items():
+            counter[getattr(p, var, NOT_AVAILABLE_LABEL)] += 1
+    return counters
+
+def _write_file(filename, rows):
+    "Write the (name, lastname, email) rows to filename"
+    header = ('$NAME$', '$SURNAME$', '$EMAIL$')
     if os.path.exists(filename):
         printf("'{}' already exists. We cannot overwrite it!", filename)
         return
-    with open(filename, 'w') as f:
-        f.write(header + '\n')
-        i = -1
-        for i, person in enumerate(persons):
-            row = ';'.join((person.name, person.lastname, person.email))
-            f.write(row + '\n')
-    printf("'{}' written with header + {} rows", filename, i + 1)
-
-def _write_file_samelab(filename, persons):
-    persons = list(persons)
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter=';', lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+    printf("'{}' written with header + {} rows", filename, len(rows))
+
+def _write_file_samelab(filename, rows):
+    "Write the (name, lastname, email) rows to filename as a single entry"
+    persons = list(rows)
     if len(persons) == 0:
         printf("No matching persons for '{}'. Check labels!", filename)
     if os.path.exists(filename):
         printf("'{}' already exists. We cannot overwrite it!", filename)
         return
-    header = ';'.join('$%dNAME$;$%dSURNAME$'%(d+1,d+1) for d in range(len(persons))) + ';$EMAIL$'
-    with open(filename, 'w') as f:
-        f.write(header + '\n')
-        names = []
-        emails = []
-        i = -1
-        for i, person in enumerate(persons):
-            names.extend([person.name, person.lastname])
-            emails.append(person.email)
-        names = ';'.join(names)
-        emails = ','.join(emails)
-        f.write(names+';'+emails+'\n')
-    printf("'{}' written with header + {} entries", filename, i + 1)
-
-def eval_formula(formula, vars):
+    # everybody goes in one row: all the names first, then all the emails.
+    # Without persons the names still take up one empty field, as they
+    # always did: the file is then ';$EMAIL$' and ';'
+    header = [f'${d}{field}$' for d in range(1, len(persons) + 1)
+                              for field in ('NAME', 'SURNAME')] or ['']
+    header.append('$EMAIL$')
+    row = [part for name, lastname, _ in persons
+                for part in (name, lastname)] or ['']
+    row.append(','.join(email for *_, email in persons))
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter=';', lineterminator='\n')
+        writer.writerow(header)
+        writer.writerow(row)
+    printf("'{}' written with header + {} entries", filename, len(persons))
+
+@functools.lru_cache
+def compile_formula(formula):
+    "Compile formula (or a part of it), so that it is parsed only once"
+    # like eval, ignore the whitespace around the terms of the formula
+    return compile(formula.strip(), '--formula--', 'eval')
+
+def eval_formula(formula, vars, code=None):
+    "Evaluate formula in vars, code is the compiled formula, if already available"
+    if code is None:
+        code = compile_formula(formula)
     try:
-        return eval(formula, vars, {})
+        # vars serves as both globals and locals: names resolve the same way
+        # and no scratch locals dict is allocated for every evaluation
+        return eval(code, vars)
     except (NameError, TypeError) as e:
         vars.pop('__builtins__', None)
         msg = 'formula failed: {}\n[{}]\n[{}]'.format(e, formula,
@@ -1247,14 +1434,12 @@ class MissingRating(KeyError):
 def get_rating(name, dict, key, fallback=None):
     """Retrieve rating.
 
-    Explanation in () or after / is ignored in the key.
+    Explanation in () or after / is ignored in the key, which is lowercased
+    like the keys in the INI file.
 
     Throws MissingRating if rating is not present.
     """
-    if key == '':
-        key = '(none)'
-    else:
-        key = key.partition('(')[0].partition('/')[0].strip().partition(',')[0].strip()
+    key = rating_key(key)
     try:
         return dict[key]
     except KeyError:
@@ -1274,8 +1459,23 @@ def gender_to_formula_label(label):
     "Convert a gender label from the survey into a single-letter label"
     return KNOWN_GENDER_LABELS[label.lower()]
 
-def categorical_scores(person, categories):
-    return {c: person.get_rating(c) for c in categories}
+def categorical_scores(person, categories, cache=None):
+    """Return a mapping {category → numerical rating} for person
+
+    The rating depends only on the category and on the answer given in the
+    application form. There are just a handful of different answers, so when
+    rating many people pass the same cache dict to avoid repeating the lookups.
+    """
+    if cache is None:
+        cache = {}
+    scores = {}
+    for c in categories:
+        key = (c, getattr(person, c.removesuffix('_rating')))
+        try:
+            scores[c] = cache[key]
+        except KeyError:
+            scores[c] = cache[key] = person.get_rating(c)
+    return scores
 
     # vars = {}
     # for attr, dict in categories.items():
@@ -1328,10 +1528,6 @@ def rank_person(person, formula, location, categories,
     #score = (score - minsc) / (maxsc - minsc) * range + offset
     return score
 
-def _yield_values(var, *values):
-    for value in values:
-        yield var, value
-
 def find_names(formula):
     g = tokenize.tokenize(io.BytesIO(formula.encode('utf-8')).readline)
     return set(tokval for toknum, tokval, _, _, _  in g
@@ -1383,29 +1579,79 @@ def find_min_max(formula, location,
         vcs_rating=vcs_rating.values(),
         underrep_rating=underrep_rating.values(),
         labels=())
-    needed = list(_yield_values(n, *choices[n]) for n in find_names(formula))
-    options = tuple(itertools.product(*needed))
-    values = [eval_formula(formula, dict(vars)) for vars in options]
-    if not values:
+    # only distinct values matter, and many answers share the same rating
+    choices = {name: tuple(dict.fromkeys(values)) for name, values in choices.items()}
+    if not all(choices[n] for n in find_names(formula)):
+        # nothing to evaluate the formula on
         return float('nan'), float('nan'), {}
 
-    minsc = min(values)
-    maxsc = max(values)
+    terms = formula.split('+')
+    minsc = maxsc = 0
+    ranges = {}
+    # the groups vary independently, so the extremes of the formula are the
+    # sums of the extremes of the groups
+    for expr, items, names in _independent_groups(formula, terms):
+        names = tuple(names)
+        exprs = [(e, compile_formula(e)) for e in (expr, *items)]
+        values = [[] for _ in exprs]
+        # a single namespace is updated in place for each combination
+        # and shared by the whole group and its terms
+        vars = {}
+        for combination in itertools.product(*(choices[n] for n in names)):
+            vars.update(zip(names, combination))
+            for (e, code), v in zip(exprs, values):
+                v.append(eval_formula(e, vars, code))
+        minsc += min(values[0])
+        maxsc += max(values[0])
+        for item, v in zip(items, values[1:]):
+            ranges[item] = min(v), max(v)
+
     # scorporate in single contributions
     items = collections.OrderedDict()
-    for item in formula.split('+'):
-        values = [eval_formula(item, dict(vars)) for vars in options]
-        max_ = max(values)
-        min_ = min(values)
+    for item in terms:
+        min_, max_ = ranges[item]
         items[item] = (max_-min_)/(maxsc-minsc)*100
     return minsc, maxsc, items
 
+def _independent_groups(formula, terms):
+    """Split the terms of formula into groups which share no variables
+
+    Return a list of (expression, terms, variables). If formula is not a
+    plain sum of terms, all of it is evaluated as a single group.
+    """
+    # count the operands of the top-level additions: if there are as many as
+    # terms, every '+' in the formula is one of those additions
+    tree = ast.parse(formula.strip(), mode='eval').body
+    count = 1
+    while isinstance(tree, ast.BinOp) and isinstance(tree.op, ast.Add):
+        count += 1
+        tree = tree.left
+    if count != len(terms):
+        return [(formula, terms, find_names(formula))]
+
+    groups = []
+    for item in terms:
+        items, names = [item], find_names(item)
+        # merge with all the groups which share a variable with this term
+        for group in [group for group in groups if group[1] & names]:
+            groups.remove(group)
+            items = group[0] + items
+            names |= group[1]
+        groups.append((items, names))
+    return [('+'.join(items), items, names) for items, names in groups]
+
+# textwrap.wrap builds a new TextWrapper on every call, share a single one
+_WRAPPER = textwrap.TextWrapper()
+
+# the same texts are shown again and again while grading and dumping
+@functools.lru_cache(maxsize=1024)
 def wrap_paragraphs(text, prefix=''):
     prefix = '\n' + ' ' * len(prefix)
     paras = text.strip().split('\n\n')
-    wrapped = (prefix.join(prefix.join(textwrap.wrap(line.strip()))
-                           for line in para.split('\n'))
-               for para in paras)
+    # join() materializes its argument anyway, so hand it lists
+    wrapped = [prefix.join([prefix.join(_WRAPPER.wrap(line.strip()))
+                            for line in para.split('\n')])
+               for para in paras]
     return ('\n'+prefix).join(wrapped)
 
 
@@ -73,6 +73,42 @@ def convert_bool(value):
         case _:
             raise ValueError(f'cannot convert {value} of type {type(value)} to bool')
 
+# There are only a handful of different answers in the rated fields,
+# so the extracted keys are cached
+@functools.lru_cache(maxsize=4096)
+def rating_key(answer):
+    """Return the key under which answer is rated in the INI file
+
+    The rule is to match anything until the first "/" or "(" or ","
+    and removing trialing whitespace if any. The match may be empty, for
+    example for an answer starting with "(". An empty answer is rated
+    under the "(none)" key.
+    """
+    answer = answer.strip()
+    if not answer:
+        return '(none)'
+    return re.match(r'(.*?)\s*(?:[(/,]|$)', answer).group(1).lower()
+
+# we only try to normalize the types of attributes with safe types
+_SAFE_TYPES = dict(str=str,
+                   bool=convert_bool,
+                   float=float,
+                   int=int)
+
+# Every attribute assignment on a Person goes through the type-aware
+# __setattr__, so the type annotations are looked up once per class
+@functools.cache
+def _field_converters(cls):
+    """Return a {field name: converter} dict for the safe-typed fields of cls"""
+    return {field.name: _SAFE_TYPES[field.type]
+            for field in dataclasses.fields(cls)
+            if field.type in _SAFE_TYPES}
+
+@functools.cache
+def _known_fields(cls):
+    """Return the set of the names of the dataclass fields of cls"""
+    return frozenset(field.name for field in dataclasses.fields(cls))
+
 @dataclasses.dataclass(kw_only=True, order=False)
 class Person:
     """The Person class hold all information about an applicant
@@ -132,6 +168,10 @@ class Person:
     # cache dict for the calls to 'score'
     _score_cache: dict = dataclasses.field(default_factory=dict, repr=False)
 
+    # cache for 'fullname', reset whenever name or lastname are set
+    _fullname: str = dataclasses.field(default=None, init=False,
+                                       repr=False, compare=False)
+
     @property
     def motivation_scores(self):
         if self._ini is None:
@@ -163,9 +203,7 @@ class Person:
         # ...
         # minor contributions = 0.5
         # ...
-        # The rule is to match anything until the first "/" or "(" or ","
-        # and removing trialing whitespace if any
-        key = re.match(r'(.+?)\s*(?:[(/,]|$)', val).group(1).lower()
+        key = rating_key(val)
 
         try:
             return ratings[key]
@@ -194,7 +232,7 @@ class Person:
             raise ValueError
 
         labels = self.labels
-        if label in self.labels:
+        if label in labels:
             return False
 
         labels = sorted(labels + [label])
@@ -209,7 +247,7 @@ class Person:
             raise ValueError
 
         labels = self.labels
-        if label not in self.labels:
+        if label not in labels:
             return False
 
         labels.remove(label)
@@ -221,7 +259,12 @@ class Person:
 
     @property
     def fullname(self) -> str:
-            return f'{self.name} {self.lastname}'
+        # fullname is the key for all per-person lookups in the INI file,
+        # so it is built once instead of on every access
+        if (fullname := self._fullname) is None:
+            fullname = f'{self.name} {self.lastname}'
+            object.__setattr__(self, '_fullname', fullname)
+        return fullname
 
     @property
     def nonmale(self) -> str:
@@ -257,23 +300,16 @@ class Person:
 
     # type-aware setattr
     def __setattr__(self, attr, value):
-        # we only try to normalize the types of attributes with safe types
-        allowed_types = dict(str=str,
-                            bool=convert_bool,
-                            float=float,
-                            int=int)
-
         # find the type of the attr from the type annotations
-        for field in dataclasses.fields(self):
-            if field.name == attr:
-                if typ := allowed_types.get(field.type):
-                    # enforce type
-                    value = typ(value)
-                break
+        if typ := _field_converters(type(self)).get(attr):
+            # enforce type
+            value = typ(value)
 
         # set the attribute using the ancestor's method to avoid  recursively
         # calling our own __setattr__
         super().__setattr__(attr, value)
+        if attr in ('name', 'lastname'):
+            super().__setattr__('_fullname', None)
         # we are setting a new attribute, so we increase the generation
         super().__setattr__('_generation', self._generation + 1)
 
@@ -302,18 +338,22 @@ class Person:
     @classmethod
     def from_row(cls, fields, values, relaxed=False, ini=None):
         # first instantiate a Person with the known/required fields
-        #  - get the list of known fields
-        known_fields = [item.name for item in dataclasses.fields(cls)]
-        #  - set their values from those found in the CSV file
-        hard_coded = {field:value for (field, value) in zip(fields, values)
-                                  if field in known_fields}
+        #  - get the set of known fields (the same for every row)
+        known_fields = _known_fields(cls)
+        #  - set their values from those found in the CSV file, and keep
+        #    the others aside in the same pass
+        hard_coded, unknown = {}, []
+        for (field, value) in zip(fields, values):
+            if field in known_fields:
+                hard_coded[field] = value
+            else:
+                unknown.append((field, value))
         person = cls(**hard_coded, _relaxed=relaxed, _ini=ini)
 
         # add all the unknown/unprocessed fields
         # all these fields will be of type str
-        for (field, value) in zip(fields, values):
-            if field not in known_fields:
-                setattr(person, field, value)
+        for (field, value) in unknown:
+            setattr(person, field, value)
 
         return person
 
@@ -327,14 +367,14 @@ class Person:
             # we don't count manually if an override was found
             return
 
+        fullname = self.fullname.lower()
+        email = self.email.lower()
         found = 0
         for year in archive:
-            # try to find candidate by exact fullname
-            candidates = year.filter(fullname=f'^{self.fullname}$')
-            if not candidates:
-                # they may write the name differently, let's try to match on the email
-                # address
-                candidates = year.filter(email=self.email)
+            # try to find candidate by exact fullname and, given that they may
+            # write the name differently, also try to match on the email address
+            candidates = (fullname in year.all_fullnames() or
+                          email in year.all_emails())
             ### TODO: we need some form of fuzzy matching here, especially people with
             ###       more then one first/last-name tend to skip some of their names
             ###       but they skip different ones every time.
@@ -377,11 +417,13 @@ class Person:
             return math.nan
 
         # create a key for the cache of score. We store there our own generation
-        # (which is updated every time we change something on Person), the INI
+        # (which is updated every time we change something on Person) and the INI
         # file generation (which is updated every time something global changes
-        # in the INI file, like for example some override was added or a reload
-        # from disk was triggered, and finally the formula, which comes as a string
-        key = (self._generation, self._ini.generation, self._ini.formula)
+        # in the INI file, like for example some override was added, the formula
+        # was set or a reload from disk was triggered). The formula itself is not
+        # part of the key: looking it up in the INI file on every access would
+        # cost more than the cache hit, and changing it bumps the generation
+        key = (self._generation, self._ini.generation)
         try:
             # we can return the cached score if nothing has changed
             return self._score_cache[key]
@@ -390,8 +432,8 @@ class Person:
             # instantiate the FormulaProxy
             fp = FormulaProxy(self)
 
-            # evaluate the formula on the proxy object
-            v = eval(self._ini.formula, {}, fp)
+            # evaluate the (already compiled) formula on the proxy object
+            v = eval(self._ini.formula_code, {}, fp)
 
             # store the score in cache and return it
             self._score_cache[key] = v
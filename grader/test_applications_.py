@@ -3,7 +3,11 @@ import os
 import time
 
 from grader.applications_ import (
+    KNOWN_FIELDS,
+    col_name_to_field,
+    index_field_aliases,
     load_applications_csv,
+    split_label_filter,
     ApplicationsIni,
     Applications)
 
@@ -245,3 +249,69 @@ def test_applications_getitem(tmp_path):
         app[3.0]
     with pytest.raises(IndexError):
         app['Unkown Person']
+
+def test_applications_ini_formula_code(tmp_path):
+    ini = get_ini(tmp_path, '[formula]\nformula = 1 + 2\n')
+
+    code = ini.formula_code
+    assert eval(code) == 3
+    # the compiled formula is cached
+    assert ini.formula_code is code
+
+    ini.formula = '2 * 3'
+    assert eval(ini.formula_code) == 6
+
+    with pytest.raises(SyntaxError):
+        ini.formula = '2 *'
+    assert ini.formula == '2 * 3'
+
+@pytest.mark.parametrize('header, field',
+                         [('Email', 'email'),
+                          ('"Email address"', 'email'),
+                          ('Last Name:', 'lastname'),
+                          ('Position [Other]', 'position_other'),
+                          ('[Other] Position', 'position_other'),
+                          ('Please type in a short Curriculum Vitae', 'cv'),
+                          ('aff-uni. Your institute', 'institute'),
+                          ('Favourite colour', 'favourite_colour')])
+def test_col_name_to_field(header, field):
+    index = index_field_aliases(KNOWN_FIELDS)
+    assert col_name_to_field(header, index) == field
+
+def test_applications_ini_equivs(tmp_path):
+    ini = get_ini(tmp_path, '[equivs]\nSome Institute = SI = Some Inst.\n')
+
+    assert ini['equivs.some institute'] == ['SI', 'Some Inst.']
+
+def test_applications_iter(tmp_path):
+    csv = get_applications_csv(tmp_path)
+    ini = get_ini(tmp_path).filename
+
+    app = Applications(csv, ini)
+
+    assert [p.fullname for p in app] == app.people.fullname
+    assert list(app) == app.people
+
+def test_load_applications_csv_short_row(tmp_path):
+    from .test_person import MARCIN
+
+    # the row has no value for the last (interned) column
+    header = list(MARCIN.keys()) + ['travel_grant']
+    csv = '\n'.join((';'.join(f'"{key}"' for key in header),
+                     ';'.join(f'"{val}"' for val in MARCIN.values()),
+                     ))
+    input = tmp_path / 'applications.csv'
+    input.write_text(csv)
+
+    people = list(load_applications_csv(input, ini=get_ini(tmp_path)))
+    assert len(people) == 1
+    assert people[0].travel_grant == ''
+    assert people[0].nationality == 'Nicaragua'
+
+@pytest.mark.parametrize('labels, accept, deny',
+                         [('XXX', {'XXX'}, set()),
+                          (['XXX', 'YYY'], {'XXX', 'YYY'}, set()),
+                          (('XXX', '-', 'ZZZ', 'WWW'), {'XXX'}, {'ZZZ', 'WWW'}),
+                          (('-', 'ZZZ'), set(), {'ZZZ'})])
+def test_split_label_filter(labels, accept, deny):
+    assert split_label_filter(labels) == (accept, deny)
@@ -1,5 +1,13 @@
-from .grader import Grader
+import io
+
+import pytest
+
+from . import cmd_completer
+from .grader import (Grader, MissingRating, find_min_max, get_rating,
+                     _write_file_samelab)
 from .util import our_configfile
+from .applications_ import ApplicationsIni
+from .test_applications_ import get_applications_csv, ini_string
 
 
 CSV_APPLICATIONS = """
@@ -112,3 +120,135 @@ def test_grader_rank_labels_filter(tmpdir, capsys):
     out, err = capsys.readouterr()
     output_lines = out.replace('-', '').strip().split('\n')[-1:]
     assert 'John Doe' in output_lines[0]
+
+
+@pytest.mark.parametrize('formula, minsc, maxsc',
+    [# independent terms
+     ('programming_rating*0.5 + motivation + nonmale', -1, 2.5),
+     # terms sharing a variable must be evaluated together
+     ('(nationality!=affiliation) + (nationality!=location)', 0, 2),
+     ('(nationality==location) - (nationality==location)*2', -1, 0),
+     # not a plain sum of terms
+     ('nonmale if motivation else 0 + motivation', 0, 1)])
+def test_find_min_max(formula, minsc, maxsc):
+    ratings = dict(open_source_rating={}, python_rating={},
+                   vcs_rating={}, underrep_rating={})
+    ans = find_min_max(formula, 'Poland',
+                       programming_rating={'novice': 0, 'expert': 1},
+                       **ratings,
+                       applied=[0, 1],
+                       all_nationalities={'Poland', 'Italy'},
+                       all_affiliations={'Poland', 'Germany'})
+    assert ans[:2] == (minsc, maxsc)
+
+
+def get_grader(tmp_path, *extra):
+    csv = get_applications_csv(tmp_path)
+    csv.with_suffix('.ini').write_text(ini_string + '\n'.join(extra))
+    return Grader(identity='zbyszek', csv_file=csv)
+
+def test_grader_equiv_extends_existing_key(tmp_path):
+    grader = get_grader(tmp_path, '[equivs]\nInst A = IA\n')
+    ini = grader.applications.ini
+
+    grader.do_equiv('Inst A = Institute A')
+
+    assert list(ini['equivs']) == ['inst a']
+    assert ini['equivs.inst a'] == ['IA', 'Institute A']
+    assert grader._equiv_master('institute a') == 'inst a'
+
+def test_grader_equiv_dotted_variant(tmp_path):
+    grader = get_grader(tmp_path)
+
+    grader.do_equiv('Univ. of X = UoX')
+
+    assert grader.applications.ini['equivs.univ. of x'] == ['UoX']
+    assert grader._equiv_master('uox') == 'univ. of x'
+
+def test_grader_equiv_save_roundtrip(tmp_path, monkeypatch):
+    # save() flushes the pager, which only exists in the interactive loop
+    monkeypatch.setattr(cmd_completer, 'PAGER', io.StringIO(), raising=False)
+    grader = get_grader(tmp_path, '[equivs]\nInst A = IA\n')
+    ini = grader.applications.ini
+
+    grader.do_equiv('Inst A = Institute A')
+    grader.do_equiv('Univ. of X = UoX')
+    out = tmp_path / 'saved.ini'
+    ini.save(out)
+
+    saved = ApplicationsIni(out)
+    assert saved['equivs'] == {'inst a': ['IA', 'Institute A'],
+                               'univ. of x': ['UoX']}
+
+@pytest.mark.parametrize('answer, rating',
+                         [('Competent/Proficient', 1.0),
+                          ('', -1.0),
+                          ('   ', -1.0),
+                          ('(unsure) maybe', 0.5)])
+def test_get_rating(answer, rating):
+    ratings = {'competent': 1.0, '(none)': -1.0, '': 0.5}
+    assert get_rating('python', ratings, answer) == rating
+
+def test_get_rating_missing():
+    with pytest.raises(MissingRating):
+        get_rating('python', {}, 'Expert')
+
+def test_grader_label_unknown(tmp_path, capsys):
+    grader = get_grader(tmp_path)
+
+    grader.do_label('FOO')
+
+    out, err = capsys.readouterr()
+    assert "no person or label matches 'FOO'" in out
+
+def test_grader_label_set_unknown(tmp_path, capsys):
+    grader = get_grader(tmp_path)
+
+    grader.do_label('Nobody Here = FOO')
+
+    out, err = capsys.readouterr()
+    assert "no person or label matches 'Nobody Here'" in out
+    assert all('FOO' not in p.labels for p in grader.applications)
+
+def test_grader_write(tmp_path, monkeypatch):
+    grader = get_grader(tmp_path)
+    marcin, one, two = grader.applications
+    marcin.add_label('INVITE')
+    one.add_label('INVITESL1')
+    two.add_label('INVITESL1')
+    two.add_label('DECLINED')
+
+    out = tmp_path / 'lists'
+    out.mkdir()
+    monkeypatch.chdir(out)
+    grader.do_write('')
+
+    assert sorted(path.name for path in out.iterdir()) == [
+        'list_confirmed.csv', 'list_custom_answer.csv', 'list_declined.csv',
+        'list_invite.csv', 'list_invite_nextyear.csv', 'list_invite_reminder.csv',
+        'list_overqualified.csv', 'list_rejected.csv', 'list_same_lab1.csv',
+        'list_shortlist.csv']
+    header = '$NAME$;$SURNAME$;$EMAIL$\n'
+    invite = header + 'Jędrzej Marcin;Mirosławski Piołun;marcin@example.com\n'
+    assert (out / 'list_invite.csv').read_text() == invite
+    assert (out / 'list_invite_reminder.csv').read_text() == invite
+    assert (out / 'list_declined.csv').read_text() == (
+        header + 'Person;Two;marcin@example.com\n')
+    assert (out / 'list_same_lab1.csv').read_text() == (
+        '$1NAME$;$1SURNAME$;$EMAIL$\n'
+        'Person;One;marcin@example.com\n')
+    # everybody has some label that keeps them out of these
+    assert (out / 'list_rejected.csv').read_text() == header
+    assert (out / 'list_confirmed.csv').read_text() == header
+
+def test_write_file_samelab(tmp_path):
+    path = tmp_path / 'same_lab.csv'
+    _write_file_samelab(path, [('Ann', 'Lee', 'ann@example.com'),
+                               ('Bo', 'Kim', 'bo@example.com')])
+    assert path.read_text() == ('$1NAME$;$1SURNAME$;$2NAME$;$2SURNAME$;$EMAIL$\n'
+                                'Ann;Lee;Bo;Kim;ann@example.com,bo@example.com\n')
+
+def test_write_file_samelab_empty(tmp_path):
+    path = tmp_path / 'same_lab.csv'
+    _write_file_samelab(path, [])
+    assert path.read_text() == ';$EMAIL$\n;\n'
@@ -1,12 +1,12 @@
 import time
 
-from grader.person import (convert_bool, Person, FormulaProxy)
-from grader.applications_ import ApplicationsIni
+from grader.person import (convert_bool, rating_key, Person, FormulaProxy)
+from grader.applications_ import ApplicationsIni, Applications
 
 import pytest
 import numpy as np
 
-from .test_applications_ import get_ini
+from .test_applications_ import get_ini, get_applications_csv
 
 MARCIN = dict(
     name = ' Jędrzej\t\t\tMarcin ',
@@ -59,6 +59,14 @@ def test_person():
     assert p.labels == []
     assert p.nonmale is True
 
+def test_person_fullname_follows_name():
+    p = Person(**MARCIN)
+    assert p.fullname == 'Jędrzej Marcin Mirosławski Piołun'
+    p.lastname = 'Piołun'
+    assert p.fullname == 'Jędrzej Marcin Piołun'
+    p.name = 'Marcin'
+    assert p.fullname == 'Marcin Piołun'
+
 def test_person_invalid_born():
     args = MARCIN | dict(born='1700')
     with pytest.raises(ValueError):
@@ -120,6 +128,17 @@ def test_person_with_ini(tmp_path):
     p.remove_label('PALEO')
     assert p.labels == []
 
+def test_person_clear_last_label_is_a_modification(tmp_path):
+    ini = get_ini(tmp_path)
+    args = MARCIN | dict(name='Person', lastname='One')
+    p = Person(**args, _ini=ini)
+    assert p.labels == ['PALEO']
+    assert not ini.has_modifications()
+
+    p.remove_label('PALEO')
+    assert p.labels == []
+    assert ini.has_modifications()
+
 def test_person_not_in_ini(tmp_path):
     ini = get_ini(tmp_path)
 
@@ -266,3 +285,48 @@ def test_get_rating(tmp_path):
     p.golf = 'novice'
     with pytest.raises(KeyError):
         p.get_rating("golf")
+
+@pytest.mark.parametrize('answer, key',
+                         [('Competent/Proficient', 'competent'),
+                          ('Minor Contributions (bug reports, mailing lists, ...)',
+                           'minor contributions'),
+                          ('yes, git', 'yes'),
+                          ('Never used', 'never used'),
+                          ('', '(none)'),
+                          ('   ', '(none)'),
+                          ('(none)', ''),
+                          ('(other) whatever', '')])
+def test_rating_key(answer, key):
+    assert rating_key(answer) == key
+
+def test_get_rating_empty_answer(tmp_path):
+    ini = get_ini(tmp_path, '[underrep_rating]\n(none) = 0.5\nyes = 1\n')
+    p = Person(**MARCIN, _ini=ini)
+
+    p.underrep = ''
+    assert p.get_rating('underrep') == 0.5
+    p.underrep = '  '
+    assert p.get_rating('underrep_rating') == 0.5
+    p.underrep = 'Yes'
+    assert p.get_rating('underrep') == 1
+
+def test_set_n_applied_archive(tmp_path):
+    csv = get_applications_csv(tmp_path)
+    old = Applications(csv, get_ini(tmp_path).filename)
+
+    p = Person(**MARCIN)
+    p.set_n_applied([old, old])
+    assert p.n_applied == 2
+    assert p.applied is True
+
+    # people who changed their name are still found by email
+    args = MARCIN | dict(name='Other', email='MARCIN@example.com')
+    p = Person(**args)
+    p.set_n_applied([old])
+    assert p.n_applied == 1
+
+    args = MARCIN | dict(name='Other', email='other@example.com')
+    p = Person(**args)
+    p.set_n_applied([old])
+    assert p.n_applied == 0
+    assert p.applied is False
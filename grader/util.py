@@ -1,7 +1,6 @@
-import numpy as np
-
 from . import cmd_completer
 from . import configfile
+from . import vector
 
 IDENTITIES = (0, 1, 2, 3, 4)
 
@@ -10,8 +9,7 @@ section_name = '{}_score-{}'.format
 
 class list_of_equivs(list):
     def __init__(self, arg=None):
-        equivs = ((item.strip() for item in arg.split('='))
-                  if arg is not None else ())
+        equivs = map(str.strip, arg.split('=')) if arg is not None else ()
         super().__init__(equivs)
 
     def __str__(self):
@@ -69,17 +67,13 @@ class list_of_float(list):
                          for item in self)
 
     def mean(self):
-        valid = [arg for arg in self if arg is not None]
-        if not valid:
-            return float('nan')
-        return np.nanmean(valid)
+        return vector.mean(self)
 
 
 class list_of_str(list):
     def __init__(self, arg=None):
         if not isinstance(arg, list):
-            arg = ((item.strip() for item in arg.split(','))
-                   if arg is not None else ())
+            arg = map(str.strip, arg.split(',')) if arg is not None else ()
         super().__init__(arg)
 
     def __str__(self):
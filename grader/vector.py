@@ -1,5 +1,4 @@
 import functools
-import numpy as np
 
 
 # In all places when you have code like this:
@@ -77,10 +76,17 @@ class vector(list):
         return vector(key for key,val in sorted(zip(self, xrange(len(self)))))
 
     def mean(self):
-        valid = [arg for arg in self if arg is not None]
-        if not valid:
-            return float('nan')
-        return np.nanmean(valid)
+        return mean(self)
+
+# the mean of the values which are not missing, i.e. neither None nor nan
+def mean(values):
+    # a plain loop, there are just a few items and no temporary list is needed
+    total, count = 0.0, 0
+    for value in values:
+        if value is not None and value == value:
+            total += value
+            count += 1
+    return total / count if count else float('nan')
 
 # wraps generators into a vector object
 def vectorize(generator_func):